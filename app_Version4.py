@@ -1,9 +1,16 @@
+import gc
 import io
-import csv
+import os
+import hashlib
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pcsv
+except ImportError:  # pyarrow é opcional: sem ele a leitura de CSV usa o motor C do pandas
+    pa = None
 
 st.set_page_config(page_title="Kite For Life - Completo", layout="wide")
 
@@ -13,21 +20,73 @@ CRITERIOS = [
     "PRANCHA ESQ/DIR", "CONTRA VENTO"
 ]
 
+# Ficheiro local com nome padrão (apenas para desenvolvimento local)
+DEFAULT_FILENAME = "kite f lifeavaliacao_de_desempenho_-_2025.xlsm - Aval.csv"
+
+# Recolha completa do GC a cada N reruns da sessão (ver fim do ficheiro)
+GC_COLLECT_EVERY = 20
+
+def _ler_excel(data: bytes) -> pd.DataFrame:
+    """Lê a primeira folha com o motor calamine (Rust); recorre ao motor por omissão se indisponível."""
+    try:
+        return pd.read_excel(io.BytesIO(data), sheet_name=0, skiprows=11, engine="calamine")
+    except (ImportError, ValueError):
+        # python-calamine não instalado, ou ficheiro que o calamine não consegue ler
+        return pd.read_excel(io.BytesIO(data), sheet_name=0, skiprows=11)
+
+def _ler_csv(fonte) -> pd.DataFrame:
+    """
+    Lê um CSV (caminho ou buffer) saltando as 11 linhas de título, com o leitor multi-thread do pyarrow.
+    Usa pyarrow.csv diretamente: o engine="pyarrow" do pandas ignora skiprows quando há cabeçalho.
+    Recorre ao motor C do pandas sem pyarrow, se o pyarrow falhar ou se o cabeçalho tiver nomes repetidos.
+    """
+    if pa is not None:
+        try:
+            tabela = pcsv.read_csv(fonte, read_options=pcsv.ReadOptions(skip_rows=11))
+            # colunas sem nome no cabeçalho (o motor C chamava-lhes 'Unnamed: N')
+            manter = [i for i, nome in enumerate(tabela.column_names) if nome.strip()]
+            nomes = [tabela.column_names[i] for i in manter]
+            if len(set(nomes)) == len(nomes):
+                return tabela.select(manter).to_pandas(types_mapper=pd.ArrowDtype)
+        except pa.ArrowException:
+            pass
+        if hasattr(fonte, "seek"):
+            fonte.seek(0)
+    return pd.read_csv(fonte, skiprows=11)
+
+# cache partilhada por todas as sessões: limitada para não acumular um DataFrame por cada upload
+@st.cache_data(show_spinner=False, max_entries=8)
+def _parse_bytes(data: bytes, name: str) -> pd.DataFrame:
+    """Converte o conteúdo de um ficheiro .xls/.xlsx/.xlsm ou .csv em DataFrame (cache por conteúdo)."""
+    if name.lower().endswith((".xls", ".xlsx", ".xlsm")):
+        df = _ler_excel(data)
+    else:
+        # csv
+        df = _ler_csv(io.BytesIO(data))
+    # Remover colunas 'Unnamed'
+    df = df.loc[:, [not (isinstance(c, str) and c.startswith("Unnamed")) for c in df.columns]]
+    return df
+
+@st.cache_data(show_spinner=False, max_entries=1)
+def _ler_csv_local(path: str, mtime: float) -> pd.DataFrame:
+    """Lê o CSV local padrão; `mtime` invalida a cache quando o ficheiro muda."""
+    df = _ler_csv(path)
+    df = df.loc[:, [not (isinstance(c, str) and c.startswith("Unnamed")) for c in df.columns]]
+    return df
+
+def chave_sem_upload():
+    """Chave dos dados sem upload: inclui o mtime do ficheiro local (se existir) para detectar alterações."""
+    try:
+        return f"local:{os.path.getmtime(DEFAULT_FILENAME)}"
+    except OSError:
+        return "demo"
+
 def ler_excel_ou_csv(uploaded):
     """Lê um ficheiro .xls/.xlsx/.xlsm ou .csv enviado via uploader."""
     if uploaded is None:
         return None
-    name = uploaded.name.lower()
     try:
-        if name.endswith((".xls", ".xlsx", ".xlsm")):
-            df = pd.read_excel(uploaded, sheet_name=0, skiprows=11)
-        else:
-            # csv
-            uploaded.seek(0)
-            df = pd.read_csv(uploaded, skiprows=11)
-        # Remover colunas 'Unnamed'
-        df = df.loc[:, ~df.columns.str.contains("^Unnamed", na=False)]
-        return df
+        return _parse_bytes(uploaded.getvalue(), uploaded.name)
     except Exception as e:
         st.warning(f"Erro ao ler o ficheiro: {e}")
         return None
@@ -44,137 +103,240 @@ def df_demo():
 
 def garantir_colunas(df):
     """Garante que o dataframe tem colunas para os critérios; se não, adiciona com zeros."""
-    for c in CRITERIOS:
-        if c not in df.columns:
-            df[c] = 0.0
+    faltam = [c for c in CRITERIOS if c not in df.columns]
+    if faltam:
+        # um único concat em vez de inserir coluna a coluna (evita fragmentar o DataFrame)
+        df = pd.concat([df, pd.DataFrame(0.0, index=df.index, columns=faltam, dtype="float32")], axis=1)
+    return df
+
+def reduzir_tipos(df):
+    """
+    Reduz a memória do bloco numérico: os critérios são notas de 0 a 5, por isso cabem em int8
+    (float32 se houver decimais ou células vazias). A Média Geral fica em float32.
+    """
+    notas = df[CRITERIOS].apply(pd.to_numeric, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    # int8 só se todas as notas forem inteiras e couberem em -128..127 (a conversão float -> int8 não verifica limites)
+    inteiras = bool(np.isfinite(notas).all() and (notas == np.round(notas)).all() and (np.abs(notas) <= 127).all())
+    df[CRITERIOS] = notas.astype(np.int8 if inteiras else np.float32)
+    if "Média Geral" in df.columns:
+        df["Média Geral"] = pd.to_numeric(df["Média Geral"], errors="coerce").astype("float32")
     return df
 
+def medias_escola(df):
+    """Médias por critério (na ordem de CRITERIOS) e média geral da escola; calculadas uma vez por carregamento."""
+    medias = df[CRITERIOS].mean().to_numpy()
+    media_geral = float(df["Média Geral"].mean()) if "Média Geral" in df.columns else 0.0
+    return medias, media_geral
+
+def lista_alunos(df):
+    """Nomes únicos de alunos (ordem de aparição) para os seletores; calculados uma vez por carregamento."""
+    return df["Aluno"].unique().tolist()
+
+def ranking_alunos(df):
+    """Alunos ordenados pela Média Geral (decrescente); calculado uma vez por carregamento."""
+    return df[["Aluno", "Média Geral"]].sort_values("Média Geral", ascending=False).reset_index(drop=True)
+
+def indice_alunos(df):
+    """
+    Índice aluno -> linha (primeira ocorrência), matriz de notas em float32 e vetor da Média Geral.
+    Construído uma vez por carregamento e guardado em st.session_state["_indice_alunos"].
+    """
+    aluno_to_idx = {}
+    for i, a in enumerate(df["Aluno"].to_numpy()):
+        aluno_to_idx.setdefault(a, i)
+    notas_mat = df[CRITERIOS].to_numpy(dtype=np.float32)
+    if "Média Geral" in df.columns:
+        medias = df["Média Geral"].to_numpy(dtype=np.float32)
+    else:
+        medias = np.zeros(len(df), dtype=np.float32)
+    return aluno_to_idx, notas_mat, medias
+
+@st.cache_resource(show_spinner=False)
+def criar_bar_plot(medias: tuple):
+    """Gráfico de barras das médias por critério; a mesma figura é reutilizada enquanto as médias não mudam."""
+    import plotly.express as px  # import tardio: só os menus com gráficos pagam o custo do plotly
+
+    dados = pd.DataFrame({"Critério": CRITERIOS, "Média": medias})
+    return px.bar(dados, x="Critério", y="Média", color="Média",
+                  color_continuous_scale="Blues", range_y=[0, 5])
+
 def criar_radar_plot(notas, titulo, comparacao=None):
-    fig = go.Figure()
-    fig.add_trace(go.Scatterpolar(r=notas, theta=CRITERIOS, fill="toself", name=titulo))
-    if comparacao is not None:
-        fig.add_trace(go.Scatterpolar(r=comparacao, theta=CRITERIOS, name="Comparação",
+    """Radar reutilizado na sessão: a figura é criada uma vez e só os valores `r` são trocados."""
+    fig = st.session_state.get("_radar_tpl")
+    if fig is None:
+        import plotly.graph_objects as go  # import tardio (ver criar_bar_plot)
+
+        fig = go.Figure()
+        fig.add_trace(go.Scatterpolar(r=[], theta=CRITERIOS, fill="toself"))
+        fig.add_trace(go.Scatterpolar(r=[], theta=CRITERIOS, name="Comparação",
                                       line=dict(dash="dash", color="gray")))
-    fig.update_layout(polar=dict(radialaxis=dict(visible=True, range=[0, 5])), showlegend=True)
+        fig.update_layout(polar=dict(radialaxis=dict(visible=True, range=[0, 5])), showlegend=True)
+        st.session_state["_radar_tpl"] = fig
+    fig.data[0].r = notas
+    fig.data[0].name = titulo
+    fig.data[1].r = comparacao if comparacao is not None else []
+    fig.data[1].visible = comparacao is not None
     return fig
 
-# --- Sidebar e Upload ---
-st.sidebar.header("🌊 Kite For Life - Completo")
-st.sidebar.write("Carrega um ficheiro Excel/CSV ou usa os dados demo inclusos.")
-uploaded_file = st.sidebar.file_uploader("Escolhe .xls/.xlsx/.xlsm/.csv (opcional)", type=["xls", "xlsx", "xlsm", "csv"])
+def preparar_dados(df):
+    """Prepara o df lido: colunas de critérios, coluna 'Aluno', Média Geral e tipos compactos."""
+    # Garantir colunas necessárias
+    df = garantir_colunas(df)
+    if "Aluno" not in df.columns:
+        # Se não existe coluna "Aluno", cria uma coluna de alunos fictícios (evita que a app quebre)
+        df["Aluno"] = np.char.add("Aluno ", np.arange(1, len(df) + 1).astype(str))
 
-# Carrega dados
-df_notas = ler_excel_ou_csv(uploaded_file)
-if df_notas is None:
-    # tenta carregar um ficheiro local com nome padrão (apenas para desenvolvimento local)
-    DEFAULT_FILENAME = "kite f lifeavaliacao_de_desempenho_-_2025.xlsm - Aval.csv"
-    try:
-        df_notas = pd.read_csv(DEFAULT_FILENAME, skiprows=11)
-        df_notas = df_notas.loc[:, ~df_notas.columns.str.contains("^Unnamed", na=False)]
-    except Exception:
-        df_notas = df_demo()
-
-# Garantir colunas necessárias
-df_notas = garantir_colunas(df_notas)
-if "Aluno" not in df_notas.columns:
-    # Se não existe coluna "Aluno", cria uma coluna de alunos fictícios (evita que a app quebre)
-    df_notas["Aluno"] = [f"Aluno {i+1}" for i in range(len(df_notas))]
-
-# Calcular média geral se não existir
-if "Média Geral" not in df_notas.columns:
-    df_notas["Média Geral"] = df_notas[CRITERIOS].mean(axis=1).round(2)
-
-# Menu principal
-menu = st.sidebar.selectbox("Navegação", ["Painel Geral", "Ficha do Aluno", "Lançar Novas Notas", "Exportar Avaliações"])
-
-# Inicializar estado para avaliações submetidas nesta sessão
-if "avaliacoes" not in st.session_state:
-    st.session_state["avaliacoes"] = []
-
-# --- Painel Geral ---
-if menu == "Painel Geral":
-    st.title("📊 Indicadores da Escola - Completo")
-    col1, col2, col3 = st.columns(3)
-    media_escola = df_notas["Média Geral"].mean() if "Média Geral" in df_notas.columns else 0.0
-    col1.metric("Média da Escola", f"{media_escola:.2f}")
-    col2.metric("Total de Alunos", len(df_notas))
-    col3.metric("Status", "Operacional")
-
-    st.subheader("Desempenho Médio por Habilidade")
-    medias = df_notas[CRITERIOS].mean().reset_index()
-    medias.columns = ["Critério", "Média"]
-    fig_bar = px.bar(medias, x="Critério", y="Média", color="Média",
-                     color_continuous_scale="Blues", range_y=[0, 5])
-    st.plotly_chart(fig_bar, use_container_width=True)
-
-    st.subheader("Lista de Alunos")
-    st.dataframe(df_notas[["Aluno", "Média Geral"]].sort_values("Média Geral", ascending=False).reset_index(drop=True))
-
-# --- Ficha do Aluno ---
-elif menu == "Ficha do Aluno":
-    st.title("👤 Ficha do Aluno")
-    aluno_sel = st.selectbox("Selecione o Aluno:", df_notas["Aluno"].unique())
-    dados_aluno = df_notas[df_notas["Aluno"] == aluno_sel].iloc[0]
-    notas_aluno = [float(dados_aluno.get(c, 0)) for c in CRITERIOS]
-
-    st.subheader(f"{aluno_sel} — Média: {dados_aluno.get('Média Geral', 0):.2f}")
-    fig_radar = criar_radar_plot(notas_aluno, aluno_sel, comparacao=list(df_notas[CRITERIOS].mean()))
+    # Calcular média geral se não existir
+    if "Média Geral" not in df.columns:
+        df["Média Geral"] = df[CRITERIOS].mean(axis=1).round(2)
+
+    # Tipos compactos para as notas (0–5) e Média Geral
+    df = reduzir_tipos(df)
+    # Nomes como category: comparações passam a ser feitas sobre códigos inteiros
+    df["Aluno"] = df["Aluno"].astype("category")
+    return df
+
+@st.fragment
+def ficha_aluno():
+    """
+    Seletor + radar do aluno; como fragmento, mudar de aluno só volta a correr este bloco.
+    Usa apenas os derivados guardados em session_state (sem tocar no df).
+    """
+    aluno_sel = st.selectbox("Selecione o Aluno:", st.session_state["_lista_alunos"])
+    aluno_to_idx, notas_mat, medias_alunos = st.session_state["_indice_alunos"]
+    idx = aluno_to_idx[aluno_sel]
+    notas_aluno = notas_mat[idx]
+
+    st.subheader(f"{aluno_sel} — Média: {medias_alunos[idx]:.2f}")
+    fig_radar = criar_radar_plot(notas_aluno, aluno_sel, comparacao=list(st.session_state["_medias_escola"][0]))
     st.plotly_chart(fig_radar, use_container_width=True)
 
     with st.expander("Notas por Critério"):
         tabela = pd.DataFrame({"Critério": CRITERIOS, "Nota": notas_aluno})
         st.table(tabela)
 
-# --- Lançar Novas Notas ---
-elif menu == "Lançar Novas Notas":
-    st.title("📝 Lançar Novas Notas")
-    with st.form("form_avaliacao"):
-        nome = st.text_input("Nome do Aluno", value="")
-        if not nome:
-            # se o utilizador não colocar nome, dá a opção de escolher existente
-            nome = st.selectbox("Ou escolha um aluno existente", df_notas["Aluno"].unique())
-
-        st.write("Atribua notas de 1 (Ruim) a 5 (Excelente):")
-        c1, c2 = st.columns(2)
-        notas_novas = {}
-        for i, crit in enumerate(CRITERIOS):
-            with (c1 if i % 2 == 0 else c2):
-                notas_novas[crit] = st.select_slider(crit, options=[1, 2, 3, 4, 5], value=3)
-        coment = st.text_area("Observações (opcional)")
-        submit = st.form_submit_button("Guardar Avaliação")
+def main():
+    """Corpo da app (sidebar, carregamento de dados e menus)."""
+    # --- Sidebar e Upload ---
+    st.sidebar.header("🌊 Kite For Life - Completo")
+    st.sidebar.write("Carrega um ficheiro Excel/CSV ou usa os dados demo inclusos.")
+    uploaded_file = st.sidebar.file_uploader("Escolhe .xls/.xlsx/.xlsm/.csv (opcional)", type=["xls", "xlsx", "xlsm", "csv"])
+
+    # Carrega dados: leitura + preparação só correm quando o ficheiro muda (chave = hash do conteúdo);
+    # nos reruns seguintes o df preparado vem do session_state
+    chave_dados = hashlib.blake2b(uploaded_file.getvalue()).hexdigest() if uploaded_file is not None else chave_sem_upload()
+    if st.session_state.get("_df_key") != chave_dados:
+        df_notas = ler_excel_ou_csv(uploaded_file)
+        # upload com erro: não guarda a chave, para voltar a tentar (e avisar) no próximo rerun
+        chave_lida = chave_dados if (df_notas is not None or uploaded_file is None) else None
+        if df_notas is None:
+            # tenta carregar um ficheiro local com nome padrão (apenas para desenvolvimento local)
+            try:
+                df_notas = _ler_csv_local(DEFAULT_FILENAME, os.path.getmtime(DEFAULT_FILENAME))
+            except Exception:
+                df_notas = df_demo()
+        df_notas = preparar_dados(df_notas)
+        # agregados calculados uma vez com os dados (evita hashing/cópias de st.cache_data em cada rerun)
+        st.session_state["_df"] = df_notas
+        st.session_state["_medias_escola"] = medias_escola(df_notas)
+        st.session_state["_indice_alunos"] = indice_alunos(df_notas)
+        st.session_state["_ranking_alunos"] = ranking_alunos(df_notas)
+        st.session_state["_lista_alunos"] = lista_alunos(df_notas)
+        st.session_state["_df_key"] = chave_lida
+
+    df_notas = st.session_state["_df"]
+
+    # Menu principal
+    menu = st.sidebar.selectbox("Navegação", ["Painel Geral", "Ficha do Aluno", "Lançar Novas Notas", "Exportar Avaliações"])
+
+    # Inicializar estado para avaliações submetidas nesta sessão
+    if "avaliacoes" not in st.session_state:
+        st.session_state["avaliacoes"] = []
+
+    # --- Painel Geral ---
+    if menu == "Painel Geral":
+        st.title("📊 Indicadores da Escola - Completo")
+        col1, col2, col3 = st.columns(3)
+        medias_criterios, media_escola = st.session_state["_medias_escola"]
+        col1.metric("Média da Escola", f"{media_escola:.2f}")
+        col2.metric("Total de Alunos", len(df_notas))
+        col3.metric("Status", "Operacional")
+
+        st.subheader("Desempenho Médio por Habilidade")
+        fig_bar = criar_bar_plot(tuple(medias_criterios.tolist()))
+        st.plotly_chart(fig_bar, use_container_width=True)
+
+        st.subheader("Lista de Alunos")
+        st.dataframe(st.session_state["_ranking_alunos"])
+
+    # --- Ficha do Aluno ---
+    elif menu == "Ficha do Aluno":
+        st.title("👤 Ficha do Aluno")
+        ficha_aluno()
+
+    # --- Lançar Novas Notas ---
+    elif menu == "Lançar Novas Notas":
+        st.title("📝 Lançar Novas Notas")
+        with st.form("form_avaliacao"):
+            # ambos os campos ficam sempre no formulário; o nome só é resolvido depois de submeter
+            nome_digitado = st.text_input("Nome do Aluno", value="")
+            nome_existente = st.selectbox("Ou escolha um aluno existente", st.session_state["_lista_alunos"])
+
+            st.write("Atribua notas de 1 (Ruim) a 5 (Excelente):")
+            c1, c2 = st.columns(2)
+            notas_novas = {}
+            for i, crit in enumerate(CRITERIOS):
+                with (c1 if i % 2 == 0 else c2):
+                    notas_novas[crit] = st.select_slider(crit, options=[1, 2, 3, 4, 5], value=3)
+            coment = st.text_area("Observações (opcional)")
+            submit = st.form_submit_button("Guardar Avaliação")
 
         if submit:
-            entrada = {"Aluno": nome, **notas_novas, "Observações": coment}
-            st.session_state.avaliacoes.append(entrada)
-            st.success(f"Avaliação de {nome} registada (na sessão).")
-
-            # Oferecer download imediato da avaliação submetida como CSV
-            buf = io.StringIO()
-            writer = csv.DictWriter(buf, fieldnames=list(entrada.keys()))
-            writer.writeheader()
-            writer.writerow(entrada)
-            buf.seek(0)
-            st.download_button("Descarregar esta avaliação (CSV)", data=buf.getvalue(), file_name=f"avaliacao_{nome.replace(' ', '_')}.csv", mime="text/csv")
-
-# --- Exportar Avaliações ---
-elif menu == "Exportar Avaliações":
-    st.title("📥 Exportar Avaliações (sessão)")
-    st.write("As avaliações submetidas nesta sessão aparecem abaixo. Para persistência automática integramos serviços externos (Google Sheets, S3, DB) — posso ajudar a adicionar.")
-
-    if not st.session_state.avaliacoes:
-        st.info("Ainda não existem avaliações submetidas nesta sessão.")
-    else:
-        df_av = pd.DataFrame(st.session_state.avaliacoes)
-        # Mostrar tabela (se existir colunas com critérios, ordena-as)
-        cols_ordenadas = ["Aluno"] + [c for c in CRITERIOS if c in df_av.columns] + [c for c in df_av.columns if c not in (["Aluno"] + CRITERIOS)]
-        cols_ordenadas = [c for c in cols_ordenadas if c in df_av.columns]
-        st.dataframe(df_av[cols_ordenadas])
-
-        # Botão para descarregar todas as avaliações como CSV
-        csv_bytes = df_av.to_csv(index=False).encode("utf-8")
-        st.download_button("Descarregar todas as avaliações (CSV)", data=csv_bytes, file_name="avaliacoes_sessao.csv", mime="text/csv")
-
-st.sidebar.markdown("---")
-st.sidebar.write("Dicas:")
-st.sidebar.write("- Para deploy no Streamlit Cloud, põe app.py e requirements.txt na raiz do repo e escolhe app.py no Deploy.")
-st.sidebar.write("- Se precisas de persistência, diz-me qual serviço preferes (Google Sheets, Firebase, S3, etc.).")
\ No newline at end of file
+            # se o utilizador não colocar nome, usa o aluno escolhido na lista
+            nome = nome_digitado.strip() or ("" if nome_existente is None else str(nome_existente).strip())
+            if not nome:
+                st.error("Indica o nome do aluno ou escolhe um aluno existente; a avaliação não foi registada.")
+            else:
+                entrada = {"Aluno": nome, **notas_novas, "Observações": coment}
+                st.session_state.avaliacoes.append(entrada)
+                st.success(f"Avaliação de {nome} registada (na sessão).")
+
+                # Oferecer download imediato da avaliação submetida como CSV (download_button não é permitido dentro de st.form)
+                csv_bytes = pd.DataFrame([entrada]).to_csv(index=False).encode("utf-8")
+                st.download_button("Descarregar esta avaliação (CSV)", data=csv_bytes, file_name=f"avaliacao_{nome.replace(' ', '_')}.csv", mime="text/csv")
+
+    # --- Exportar Avaliações ---
+    elif menu == "Exportar Avaliações":
+        st.title("📥 Exportar Avaliações (sessão)")
+        st.write("As avaliações submetidas nesta sessão aparecem abaixo. Para persistência automática integramos serviços externos (Google Sheets, S3, DB) — posso ajudar a adicionar.")
+
+        if not st.session_state.avaliacoes:
+            st.info("Ainda não existem avaliações submetidas nesta sessão.")
+        else:
+            df_av = pd.DataFrame(st.session_state.avaliacoes)
+            # Mostrar tabela (se existir colunas com critérios, ordena-as)
+            cols_ordenadas = ["Aluno"] + [c for c in CRITERIOS if c in df_av.columns] + [c for c in df_av.columns if c not in (["Aluno"] + CRITERIOS)]
+            cols_ordenadas = [c for c in cols_ordenadas if c in df_av.columns]
+            st.dataframe(df_av[cols_ordenadas])
+
+            # Botão para descarregar todas as avaliações como CSV
+            # mesmo formato que o download individual (to_csv); são poucas linhas por sessão
+            csv_bytes = df_av[cols_ordenadas].to_csv(index=False).encode("utf-8")
+            st.download_button("Descarregar todas as avaliações (CSV)", data=csv_bytes, file_name="avaliacoes_sessao.csv", mime="text/csv")
+
+    st.sidebar.markdown("---")
+    st.sidebar.write("Dicas:")
+    st.sidebar.write("- Para deploy no Streamlit Cloud, põe app.py e requirements.txt na raiz do repo e escolhe app.py no Deploy.")
+    st.sidebar.write("- Se precisas de persistência, diz-me qual serviço preferes (Google Sheets, Firebase, S3, etc.).")
+
+# GC automático desligado durante o rerun (muitos objetos temporários pandas/plotly).
+# O finally reativa-o mesmo quando o Streamlit interrompe o script (RerunException, st.stop) ou há erro;
+# a cada GC_COLLECT_EVERY reruns da sessão faz uma recolha completa, no fim do rerun (página já desenhada).
+gc.disable()
+try:
+    main()
+finally:
+    gc.enable()
+    st.session_state["_reruns"] = st.session_state.get("_reruns", 0) + 1
+    if st.session_state["_reruns"] % GC_COLLECT_EVERY == 0:
+        gc.collect()
@@ -10,12 +10,20 @@ Funcionalidades:
 - Download de avaliações submetidas na sessão
 """
 
+import gc
 import io
-import csv
+import os
+import hashlib
+from functools import lru_cache
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pcsv
+except ImportError:  # pyarrow é opcional: sem ele a leitura de CSV usa o motor C do pandas
+    pa = None
 
 st.set_page_config(page_title="Kite For Life - Version 4", layout="wide")
 
@@ -26,34 +34,104 @@ CRITERIOS = [
     "PRANCHA ESQ/DIR", "CONTRA VENTO"
 ]
 
+# Ficheiro local padrão, usado apenas em desenvolvimento quando não há upload
+DEFAULT_LOCAL = "kite f lifeavaliacao_de_desempenho_-_2025.xlsm - Aval.csv"
+
+# Recolha completa do GC a cada N reruns da sessão (ver bloco final do ficheiro)
+GC_COLLECT_EVERY = 20
+
 
+@lru_cache(maxsize=512)
 def normalize_colname(name: str) -> str:
-    """Remove espaços extras, converte para maiúsculas e normaliza acentos simples."""
+    """
+    Remove espaços extras, converte para maiúsculas e normaliza acentos simples.
+    Memoizado: os mesmos cabeçalhos repetem-se em todos os reruns.
+    """
     if not isinstance(name, str):
         return ""
     return " ".join(name.strip().upper().split())
 
 
+def read_excel_bytes(data: bytes) -> pd.DataFrame:
+    """
+    Lê a primeira folha de um excel com o motor calamine (python-calamine, muito mais rápido que openpyxl).
+    Se o python-calamine não estiver instalado (ou não conseguir ler o ficheiro), recorre ao openpyxl.
+    """
+    try:
+        return pd.read_excel(io.BytesIO(data), sheet_name=0, skiprows=11, engine="calamine")
+    except (ImportError, ValueError):
+        return pd.read_excel(io.BytesIO(data), sheet_name=0, skiprows=11, engine="openpyxl")
+
+
+def read_csv_source(source) -> pd.DataFrame:
+    """
+    Lê um CSV (caminho ou buffer) saltando as 11 linhas de título.
+    Usa pyarrow.csv diretamente (multi-thread, colunas em dtypes Arrow) porque o engine="pyarrow"
+    do pandas ignora skiprows quando há linha de cabeçalho. Colunas com nome vazio são descartadas,
+    como as 'Unnamed: N' do motor C.
+    Recorre ao motor C do pandas se o pyarrow não estiver instalado, falhar a leitura
+    ou o cabeçalho tiver nomes repetidos (que o pandas desambigua com sufixos .1, .2, ...).
+    """
+    if pa is not None:
+        try:
+            table = pcsv.read_csv(source, read_options=pcsv.ReadOptions(skip_rows=11))
+            keep = [i for i, name in enumerate(table.column_names) if name.strip()]
+            names = [table.column_names[i] for i in keep]
+            if len(set(names)) == len(names):
+                return table.select(keep).to_pandas(types_mapper=pd.ArrowDtype)
+        except pa.ArrowException:
+            pass
+        if hasattr(source, "seek"):
+            source.seek(0)
+    return pd.read_csv(source, skiprows=11)
+
+
+# cache partilhada por todas as sessões: limitada para não acumular um DataFrame por cada upload
+@st.cache_data(show_spinner=False, max_entries=8)
+def _parse_bytes(data: bytes, name: str) -> pd.DataFrame:
+    """
+    Converte o conteúdo (bytes) de um ficheiro excel/csv em DataFrame.
+    Cacheado pelo conteúdo: os reruns do Streamlit não voltam a fazer parsing do mesmo ficheiro.
+    """
+    if name.lower().endswith((".xls", ".xlsx", ".xlsm")):
+        df = read_excel_bytes(data)
+    else:
+        df = read_csv_source(io.BytesIO(data))
+    # Remove colunas 'Unnamed' que frequentemente aparecem depois de skiprows
+    df = df.loc[:, [not (isinstance(c, str) and c.startswith("Unnamed")) for c in df.columns]]
+    return df
+
+
+@st.cache_data(show_spinner=False, max_entries=1)
+def read_local_csv(path: str, mtime: float) -> pd.DataFrame:
+    """Lê o CSV local padrão (dev). `mtime` entra na chave da cache para detectar alterações."""
+    df = read_csv_source(path)
+    df = df.loc[:, [not (isinstance(c, str) and c.startswith("Unnamed")) for c in df.columns]]
+    return df
+
+
+def local_data_key() -> str:
+    """
+    Chave dos dados quando não há upload. Inclui o mtime do ficheiro local padrão (se existir),
+    para que uma alteração ao ficheiro volte a carregar e preparar o df da sessão.
+    """
+    try:
+        return f"local:{os.path.getmtime(DEFAULT_LOCAL)}"
+    except OSError:
+        return "demo"
+
+
 def try_read_table(uploaded):
     """
     Lê uploaded file (BytesIO/File) e tenta detectar excel/csv.
-    Para excel, usa engine openpyxl quando aplicável.
+    O parsing é delegado a `_parse_bytes` (cacheado pelo conteúdo do ficheiro).
     Retorna DataFrame ou None em caso de erro.
     """
     if uploaded is None:
         return None
 
-    fname = uploaded.name.lower()
     try:
-        if fname.endswith((".xls", ".xlsx", ".xlsm")):
-            # pd.read_excel detecta engine; explicitamos openpyxl para xlsx/xlsm
-            df = pd.read_excel(uploaded, sheet_name=0, skiprows=11, engine="openpyxl")
-        else:
-            uploaded.seek(0)
-            df = pd.read_csv(uploaded, skiprows=11)
-        # Remove colunas 'Unnamed' que frequentemente aparecem depois de skiprows
-        df = df.loc[:, ~df.columns.str.contains("^Unnamed", na=False)]
-        return df
+        return _parse_bytes(uploaded.getvalue(), uploaded.name)
     except Exception as e:
         st.warning(f"Falha ao ler ficheiro '{uploaded.name}': {e}")
         return None
@@ -71,201 +149,341 @@ def demo_dataframe():
     return df
 
 
-def map_columns_to_criterios(df: pd.DataFrame):
+@st.cache_data(show_spinner=False)
+def criterios_col_map(columns: tuple) -> dict:
     """
-    Tenta alinhar as colunas do dataframe com os CRITERIOS.
-    Retorna um DataFrame com colunas renomeadas para os nomes dos critérios (quando possível)
-    e mantém outras colunas como estão (por exemplo 'Aluno', 'Média Geral').
+    Calcula o mapeamento {coluna original: critério} a partir dos nomes das colunas.
+    Cacheado pelo tuplo de colunas: o mesmo cabeçalho não volta a ser analisado.
     """
     col_map = {}
-    normalized_cols = {c: normalize_colname(c) for c in df.columns}
-    inv_index = {normalize_colname(c): c for c in df.columns}
+    norm2orig = {normalize_colname(c): c for c in columns}
 
-    # 1) Busca correspondência exata
+    # 1) Busca correspondência exata (lookup no dicionário normalizado)
     for crit in CRITERIOS:
-        # tenta encontrar coluna cujo normalized == crit
-        for orig, norm in normalized_cols.items():
-            if norm == crit:
-                col_map[inv_index[norm]] = crit
-                break
+        orig = norm2orig.get(crit)
+        if orig is not None:
+            col_map[orig] = crit
 
     # 2) Busca correspondência por inclusão (col contains crit words) - tentativa heurística
+    #    evitar mapear colunas que claramente são 'ALUNO' ou 'MÉDIA'
+    candidatos = [
+        norm for norm in norm2orig
+        if not ("ALUNO" in norm or "MEDIA" in norm or "MÉDIA" in norm)
+    ]
+    mapeados = set(col_map.values())
     for crit in CRITERIOS:
-        if crit in col_map.values():
+        if crit in mapeados:
             continue
-        crit_words = crit.split()
-        for orig, norm in normalized_cols.items():
-            if inv_index[norm] in col_map:
-                continue
-            # se a coluna contiver a primeira palavra do critério ou vice-versa
-            if any(w in norm for w in crit_words) or any(w in norm for w in [crit.replace("/", " ").split()[0]]):
-                # evitar mapear colunas que claramente são 'ALUNO' ou 'MÉDIA'
-                if "ALUNO" in norm or "MEDIA" in norm or "MÉDIA" in norm:
-                    continue
-                col_map[inv_index[norm]] = crit
+        # palavras do critério + a primeira palavra com "/" tratado como separador
+        crit_words = crit.split() + [crit.replace("/", " ").split()[0]]
+        for norm in candidatos:
+            orig = norm2orig[norm]
+            # se a coluna contiver (como substring) alguma palavra do critério
+            if orig not in col_map and any(w in norm for w in crit_words):
+                col_map[orig] = crit
+                mapeados.add(crit)
                 break
 
-    # Renomear conforme o mapeamento
-    df_renamed = df.rename(columns=col_map)
-    return df_renamed
+    return col_map
+
+
+def map_columns_to_criterios(df: pd.DataFrame):
+    """
+    Tenta alinhar as colunas do dataframe com os CRITERIOS.
+    Retorna um DataFrame com colunas renomeadas para os nomes dos critérios (quando possível)
+    e mantém outras colunas como estão (por exemplo 'Aluno', 'Média Geral').
+    """
+    return df.rename(columns=criterios_col_map(tuple(df.columns)))
 
 
 def ensure_criterios_columns(df: pd.DataFrame):
     """Garante que todas as colunas de CRITERIOS existem no DF (preenche com zeros quando ausentes)."""
-    for c in CRITERIOS:
-        if c not in df.columns:
-            df[c] = 0.0
+    missing = [c for c in CRITERIOS if c not in df.columns]
+    if missing:
+        # um único concat em vez de inserir coluna a coluna (evita fragmentar o DataFrame)
+        df = pd.concat([df, pd.DataFrame(0.0, index=df.index, columns=missing, dtype="float32")], axis=1)
+    return df
+
+
+def downcast_criterios(df: pd.DataFrame):
+    """
+    Converte os critérios para tipos compactos. Assume notas na escala 0–5:
+    int8 quando todas são inteiras, float32 se houver decimais ou células vazias.
+    A 'Média Geral' é guardada como float32.
+    """
+    notas = df[CRITERIOS].apply(pd.to_numeric, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    # int8 só se todas as notas forem inteiras e couberem em -128..127 (a conversão float -> int8 não verifica limites)
+    inteiras = bool(np.isfinite(notas).all() and (notas == np.round(notas)).all() and (np.abs(notas) <= 127).all())
+    df[CRITERIOS] = notas.astype(np.int8 if inteiras else np.float32)
+    if "Média Geral" in df.columns:
+        df["Média Geral"] = pd.to_numeric(df["Média Geral"], errors="coerce").astype("float32")
     return df
 
 
+def school_means(df: pd.DataFrame):
+    """
+    Agregados da escola: médias por critério (array na ordem de CRITERIOS) e média da 'Média Geral'.
+    Calculado uma vez quando o df é (re)carregado e guardado em st.session_state["_school_means"].
+    """
+    medias = df[CRITERIOS].mean().to_numpy()
+    media_geral = float(df["Média Geral"].mean()) if "Média Geral" in df.columns else 0.0
+    return medias, media_geral
+
+
+def student_names(df: pd.DataFrame) -> list:
+    """Lista de alunos únicos (ordem de aparição) usada nos seletores; guardada em st.session_state["_student_names"]."""
+    return df["Aluno"].unique().tolist()
+
+
+def student_ranking(df: pd.DataFrame):
+    """Tabela Aluno / Média Geral ordenada de forma decrescente (guardada em st.session_state["_student_ranking"])."""
+    return df[["Aluno", "Média Geral"]].sort_values("Média Geral", ascending=False).reset_index(drop=True)
+
+
+def student_index(df: pd.DataFrame):
+    """
+    Estruturas para consultar um aluno sem filtrar o DataFrame:
+    dicionário aluno -> linha (primeira ocorrência), matriz de notas (float32) e vetor da 'Média Geral'.
+    Construídas uma vez por carregamento e guardadas em st.session_state["_student_index"].
+    """
+    aluno_to_idx = {}
+    for i, a in enumerate(df["Aluno"].to_numpy()):
+        aluno_to_idx.setdefault(a, i)
+    notas_mat = df[CRITERIOS].to_numpy(dtype=np.float32)
+    if "Média Geral" in df.columns:
+        medias = df["Média Geral"].to_numpy(dtype=np.float32)
+    else:
+        medias = np.zeros(len(df), dtype=np.float32)
+    return aluno_to_idx, notas_mat, medias
+
+
+@st.cache_resource(show_spinner=False)
+def bar_figure(medias: tuple):
+    """
+    Gráfico de barras das médias por critério.
+    Cacheado como recurso: enquanto as médias não mudam, a mesma figura é reutilizada (não é alterada depois).
+    """
+    import plotly.express as px  # import tardio: só os menus com gráficos pagam o custo do plotly
+
+    dados = pd.DataFrame({"Critério": CRITERIOS, "Média": medias})
+    return px.bar(dados, x="Critério", y="Média", color="Média",
+                  color_continuous_scale="Blues", range_y=[0, 5])
+
+
 def radar_figure(notas, comparacao=None, title=None):
-    fig = go.Figure()
-    fig.add_trace(go.Scatterpolar(r=notas, theta=CRITERIOS, fill="toself", name=title or "Aluno"))
-    if comparacao is not None:
-        fig.add_trace(go.Scatterpolar(r=comparacao, theta=CRITERIOS, name="Média Escola",
+    """
+    Radar do aluno. A figura (traços + layout) é construída uma vez por sessão e guardada em
+    st.session_state; nos reruns seguintes só se trocam os valores `r` e o nome do traço.
+    """
+    fig = st.session_state.get("_radar_tpl")
+    if fig is None:
+        import plotly.graph_objects as go  # import tardio (ver bar_figure)
+
+        fig = go.Figure()
+        fig.add_trace(go.Scatterpolar(r=[], theta=CRITERIOS, fill="toself"))
+        fig.add_trace(go.Scatterpolar(r=[], theta=CRITERIOS, name="Média Escola",
                                       line=dict(dash="dash", color="gray")))
-    fig.update_layout(polar=dict(radialaxis=dict(visible=True, range=[0, 5])), showlegend=True)
+        fig.update_layout(polar=dict(radialaxis=dict(visible=True, range=[0, 5])), showlegend=True)
+        st.session_state["_radar_tpl"] = fig
+    fig.data[0].r = notas
+    fig.data[0].name = title or "Aluno"
+    fig.data[1].r = comparacao if comparacao is not None else []
+    fig.data[1].visible = comparacao is not None
     return fig
 
 
-# --- Interface / fluxo principal ---
-st.sidebar.header("🌊 Kite For Life - Version 4")
-st.sidebar.write("Carrega um ficheiro Excel/CSV ou usa os dados demo incluídos.")
+def prepare_dataframe(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Pipeline de normalização após a leitura: nomes de colunas, mapeamento de critérios,
+    coluna 'Aluno', 'Média Geral' e tipos compactos.
+    """
+    # Normalizar nomes e tentar mapear critérios
+    #  - remover espaços estranhos e normalizar maiúsculas
+    df.columns = [normalize_colname(c) for c in df.columns]
+    df = map_columns_to_criterios(df)
+    df = ensure_criterios_columns(df)
+
+    # Se não houver coluna Aluno, cria identificadores simples
+    if "ALUNO" not in df.columns and "Aluno" not in df.columns:
+        df.insert(0, "Aluno", np.char.add("Aluno ", np.arange(1, len(df) + 1).astype(str)))
+
+    # Padroniza nome da coluna "Aluno" para 'Aluno' se veio em maiúsculas
+    if "ALUNO" in df.columns and "Aluno" not in df.columns:
+        df = df.rename(columns={"ALUNO": "Aluno"})
+
+    # Calcular Média Geral se ausente
+    if "Média Geral" not in df.columns and "MÉDIA GERAL" not in df.columns:
+        # usa colunas CRITERIOS (caso existam) para calcular
+        try:
+            df["Média Geral"] = df[CRITERIOS].mean(axis=1).round(2)
+        except Exception:
+            df["Média Geral"] = 0.0
+    else:
+        # se col vem em maiúsculas acentuadas
+        if "MÉDIA GERAL" in df.columns and "Média Geral" not in df.columns:
+            df = df.rename(columns={"MÉDIA GERAL": "Média Geral"})
+
+    # Critérios (0–5) em int8/float32 e Média Geral em float32
+    df = downcast_criterios(df)
+
+    # Assegura que 'Aluno' exista e esteja como string; guardada como category
+    # (filtros por aluno comparam códigos inteiros e os nomes repetidos ocupam menos memória)
+    df["Aluno"] = df["Aluno"].astype(str).astype("category")
+    return df
 
-uploaded_file = st.sidebar.file_uploader("Upload .xls/.xlsx/.xlsm/.csv (opcional)", type=["xls", "xlsx", "xlsm", "csv"])
 
-# 1) Ler dados do uploader (se existir)
-df = try_read_table(uploaded_file)
+@st.fragment
+def student_card():
+    """
+    Conteúdo da Ficha do Aluno (seletor, radar e tabela de notas).
+    É um fragmento: ao escolher outro aluno só este bloco volta a correr, não o script inteiro.
+    Lê apenas os derivados do df guardados em st.session_state (nomes, índice e médias da escola).
+    """
+    aluno_sel = st.selectbox("Selecione o Aluno:", st.session_state["_student_names"])
+    aluno_to_idx, notas_mat, medias_alunos = st.session_state["_student_index"]
+    idx = aluno_to_idx[aluno_sel]
+    notas_aluno = notas_mat[idx]
 
-# 2) Se não carregou, tenta carregar um ficheiro local padrão (apenas em dev) ou usa demo
-if df is None:
-    # tentar arquivo local padrão (só em desenvolvimento local)
-    DEFAULT_LOCAL = "kite f lifeavaliacao_de_desempenho_-_2025.xlsm - Aval.csv"
-    try:
-        local_df = pd.read_csv(DEFAULT_LOCAL, skiprows=11)
-        local_df = local_df.loc[:, ~local_df.columns.str.contains("^Unnamed", na=False)]
-        df = local_df
-    except Exception:
-        df = demo_dataframe()
-
-# Normalizar nomes e tentar mapear critérios
-#  - remover espaços estranhos e normalizar maiúsculas
-df.columns = [normalize_colname(c) for c in df.columns]
-df = map_columns_to_criterios(df)
-df = ensure_criterios_columns(df)
-
-# Se não houver coluna Aluno, cria identificadores simples
-if "ALUNO" not in df.columns and "Aluno" not in df.columns:
-    df.insert(0, "Aluno", [f"Aluno {i+1}" for i in range(len(df))])
-
-# Padroniza nome da coluna "Aluno" para 'Aluno' se veio em maiúsculas
-if "ALUNO" in df.columns and "Aluno" not in df.columns:
-    df = df.rename(columns={"ALUNO": "Aluno"})
-
-# Calcular Média Geral se ausente
-if "Média Geral" not in df.columns and "MÉDIA GERAL" not in df.columns:
-    # usa colunas CRITERIOS (caso existam) para calcular
-    try:
-        df["Média Geral"] = df[CRITERIOS].mean(axis=1).round(2)
-    except Exception:
-        df["Média Geral"] = 0.0
-else:
-    # se col vem em maiúsculas acentuadas
-    if "MÉDIA GERAL" in df.columns and "Média Geral" not in df.columns:
-        df = df.rename(columns={"MÉDIA GERAL": "Média Geral"})
-
-# Assegura que 'Aluno' exista e esteja como string
-df["Aluno"] = df["Aluno"].astype(str)
-
-# Menu
-menu = st.sidebar.selectbox("Navegação", ["Painel Geral", "Ficha do Aluno", "Lançar Novas Notas", "Exportar Avaliações"])
-
-# Estado para avaliações da sessão
-if "avaliacoes" not in st.session_state:
-    st.session_state["avaliacoes"] = []
-
-# --- Painel Geral ---
-if menu == "Painel Geral":
-    st.title("📊 Painel Geral - Kite For Life")
-    col1, col2, col3 = st.columns(3)
-    media_escola = float(df["Média Geral"].mean()) if "Média Geral" in df.columns else 0.0
-    col1.metric("Média da Escola", f"{media_escola:.2f}")
-    col2.metric("Total de Alunos", len(df))
-    col3.metric("Status", "Operacional")
-
-    st.subheader("Média por Critério")
-    medias = df[CRITERIOS].mean().reset_index()
-    medias.columns = ["Critério", "Média"]
-    fig_bar = px.bar(medias, x="Critério", y="Média", color="Média",
-                     color_continuous_scale="Blues", range_y=[0, 5])
-    st.plotly_chart(fig_bar, use_container_width=True)
-
-    st.subheader("Lista de Alunos")
-    st.dataframe(df[["Aluno", "Média Geral"]].sort_values("Média Geral", ascending=False).reset_index(drop=True))
-
-# --- Ficha do Aluno ---
-elif menu == "Ficha do Aluno":
-    st.title("👤 Ficha do Aluno")
-    aluno_sel = st.selectbox("Selecione o Aluno:", df["Aluno"].unique())
-    dados_aluno = df[df["Aluno"] == aluno_sel].iloc[0]
-    notas_aluno = [float(dados_aluno.get(c, 0)) for c in CRITERIOS]
-
-    st.subheader(f"{aluno_sel} — Média: {dados_aluno.get('Média Geral', 0):.2f}")
-    fig_radar = radar_figure(notas_aluno, comparacao=list(df[CRITERIOS].mean()), title=aluno_sel)
+    st.subheader(f"{aluno_sel} — Média: {medias_alunos[idx]:.2f}")
+    fig_radar = radar_figure(notas_aluno, comparacao=list(st.session_state["_school_means"][0]), title=aluno_sel)
     st.plotly_chart(fig_radar, use_container_width=True)
 
     with st.expander("Notas por Critério"):
         tabela = pd.DataFrame({"Critério": CRITERIOS, "Nota": notas_aluno})
         st.table(tabela)
 
-# --- Lançar Novas Notas ---
-elif menu == "Lançar Novas Notas":
-    st.title("📝 Lançar Novas Notas")
-    with st.form("form_avaliacao"):
-        nome = st.text_input("Nome do Aluno")
-        if not nome:
-            nome = st.selectbox("Ou escolha um aluno existente", df["Aluno"].unique())
-
-        st.write("Atribua notas de 1 (Ruim) a 5 (Excelente):")
-        c1, c2 = st.columns(2)
-        notas_novas = {}
-        for i, crit in enumerate(CRITERIOS):
-            with (c1 if i % 2 == 0 else c2):
-                notas_novas[crit] = st.select_slider(crit, options=[1, 2, 3, 4, 5], value=3)
-        coment = st.text_area("Observações (opcional)")
-        submit = st.form_submit_button("Guardar Avaliação")
+
+def main():
+    """Fluxo principal da app: sidebar, carregamento/normalização dos dados e menus."""
+    # --- Interface / fluxo principal ---
+    st.sidebar.header("🌊 Kite For Life - Version 4")
+    st.sidebar.write("Carrega um ficheiro Excel/CSV ou usa os dados demo incluídos.")
+
+    uploaded_file = st.sidebar.file_uploader("Upload .xls/.xlsx/.xlsm/.csv (opcional)", type=["xls", "xlsx", "xlsm", "csv"])
+
+    # Chave dos dados: hash do conteúdo enviado (sem upload: mtime do ficheiro local, ou "demo").
+    # Leitura + normalização só correm quando a chave muda; os reruns seguintes reutilizam o df da sessão.
+    data_key = hashlib.blake2b(uploaded_file.getvalue()).hexdigest() if uploaded_file is not None else local_data_key()
+
+    if st.session_state.get("_df_key") != data_key:
+        # 1) Ler dados do uploader (se existir)
+        df = try_read_table(uploaded_file)
+        # se o upload falhou, não guarda a chave: o próximo rerun volta a tentar (e a mostrar o aviso)
+        loaded_key = data_key if (df is not None or uploaded_file is None) else None
+
+        # 2) Se não carregou, tenta carregar um ficheiro local padrão (apenas em dev) ou usa demo
+        if df is None:
+            # tentar arquivo local padrão (só em desenvolvimento local)
+            try:
+                df = read_local_csv(DEFAULT_LOCAL, os.path.getmtime(DEFAULT_LOCAL))
+            except Exception:
+                df = demo_dataframe()
+
+        df = prepare_dataframe(df)
+        # Derivados do df calculados uma só vez por carregamento e guardados ao lado dele:
+        # st.cache_data com um DataFrame como argumento faria hash do df e devolveria uma cópia em cada rerun
+        st.session_state["_df"] = df
+        st.session_state["_school_means"] = school_means(df)
+        st.session_state["_student_index"] = student_index(df)
+        st.session_state["_student_ranking"] = student_ranking(df)
+        st.session_state["_student_names"] = student_names(df)
+        st.session_state["_df_key"] = loaded_key
+
+    df = st.session_state["_df"]
+
+    # Menu
+    menu = st.sidebar.selectbox("Navegação", ["Painel Geral", "Ficha do Aluno", "Lançar Novas Notas", "Exportar Avaliações"])
+
+    # Estado para avaliações da sessão
+    if "avaliacoes" not in st.session_state:
+        st.session_state["avaliacoes"] = []
+
+    # --- Painel Geral ---
+    if menu == "Painel Geral":
+        st.title("📊 Painel Geral - Kite For Life")
+        col1, col2, col3 = st.columns(3)
+        medias_criterios, media_escola = st.session_state["_school_means"]
+        col1.metric("Média da Escola", f"{media_escola:.2f}")
+        col2.metric("Total de Alunos", len(df))
+        col3.metric("Status", "Operacional")
+
+        st.subheader("Média por Critério")
+        fig_bar = bar_figure(tuple(medias_criterios.tolist()))
+        st.plotly_chart(fig_bar, use_container_width=True)
+
+        st.subheader("Lista de Alunos")
+        st.dataframe(st.session_state["_student_ranking"])
+
+    # --- Ficha do Aluno ---
+    elif menu == "Ficha do Aluno":
+        st.title("👤 Ficha do Aluno")
+        student_card()
+
+    # --- Lançar Novas Notas ---
+    elif menu == "Lançar Novas Notas":
+        st.title("📝 Lançar Novas Notas")
+        with st.form("form_avaliacao"):
+            # Ambos os campos vivem dentro do form: nenhum deles provoca rerun antes do submit
+            nome_digitado = st.text_input("Nome do Aluno")
+            nome_existente = st.selectbox("Ou escolha um aluno existente", st.session_state["_student_names"])
+
+            st.write("Atribua notas de 1 (Ruim) a 5 (Excelente):")
+            c1, c2 = st.columns(2)
+            notas_novas = {}
+            for i, crit in enumerate(CRITERIOS):
+                with (c1 if i % 2 == 0 else c2):
+                    notas_novas[crit] = st.select_slider(crit, options=[1, 2, 3, 4, 5], value=3)
+            coment = st.text_area("Observações (opcional)")
+            submit = st.form_submit_button("Guardar Avaliação")
 
         if submit:
-            entrada = {"Aluno": nome, **notas_novas, "Observações": coment}
-            st.session_state.avaliacoes.append(entrada)
-            st.success(f"Avaliação de {nome} registada (na sessão).")
-
-            # Download imediato como CSV
-            buf = io.StringIO()
-            writer = csv.DictWriter(buf, fieldnames=list(entrada.keys()))
-            writer.writeheader()
-            writer.writerow(entrada)
-            buf.seek(0)
-            st.download_button("Descarregar avaliação (CSV)", data=buf.getvalue(),
-                               file_name=f"avaliacao_{nome.replace(' ', '_')}.csv", mime="text/csv")
-
-# --- Exportar Avaliações ---
-elif menu == "Exportar Avaliações":
-    st.title("📥 Exportar Avaliações (sessão)")
-    if not st.session_state.avaliacoes:
-        st.info("Ainda não existem avaliações submetidas nesta sessão.")
-    else:
-        df_av = pd.DataFrame(st.session_state.avaliacoes)
-        # Organiza colunas: Aluno -> CRITERIOS -> restantes
-        cols_ordenadas = ["Aluno"] + [c for c in CRITERIOS if c in df_av.columns] + [c for c in df_av.columns if c not in (["Aluno"] + CRITERIOS)]
-        cols_ordenadas = [c for c in cols_ordenadas if c in df_av.columns]
-        st.dataframe(df_av[cols_ordenadas])
-
-        csv_bytes = df_av.to_csv(index=False).encode("utf-8")
-        st.download_button("Descarregar todas as avaliações (CSV)", data=csv_bytes, file_name="avaliacoes_sessao.csv", mime="text/csv")
-
-# Footer / dicas
-st.sidebar.markdown("---")
-st.sidebar.write("Dicas:")
-st.sidebar.write("- Coloca este ficheiro (app_Version4.py) e requirements.txt na raiz do repo antes de fazer deploy.")
-st.sidebar.write("- Se usares Excel (.xlsx / .xlsm), garante openpyxl no requirements.")
\ No newline at end of file
+            # O nome só é resolvido após submeter: texto escrito tem prioridade sobre a lista
+            nome = nome_digitado.strip() or ("" if nome_existente is None else str(nome_existente).strip())
+            if not nome:
+                st.error("Sem nome de aluno: escreve um nome ou escolhe um aluno existente. Avaliação não registada.")
+            else:
+                entrada = {"Aluno": nome, **notas_novas, "Observações": coment}
+                st.session_state.avaliacoes.append(entrada)
+                st.success(f"Avaliação de {nome} registada (na sessão).")
+
+                # Download imediato como CSV (fora do form: st.download_button não é permitido dentro de st.form)
+                csv_bytes = pd.DataFrame([entrada]).to_csv(index=False).encode("utf-8")
+                st.download_button("Descarregar avaliação (CSV)", data=csv_bytes,
+                                   file_name=f"avaliacao_{nome.replace(' ', '_')}.csv", mime="text/csv")
+
+    # --- Exportar Avaliações ---
+    elif menu == "Exportar Avaliações":
+        st.title("📥 Exportar Avaliações (sessão)")
+        if not st.session_state.avaliacoes:
+            st.info("Ainda não existem avaliações submetidas nesta sessão.")
+        else:
+            df_av = pd.DataFrame(st.session_state.avaliacoes)
+            # Organiza colunas: Aluno -> CRITERIOS -> restantes
+            cols_ordenadas = ["Aluno"] + [c for c in CRITERIOS if c in df_av.columns] + [c for c in df_av.columns if c not in (["Aluno"] + CRITERIOS)]
+            cols_ordenadas = [c for c in cols_ordenadas if c in df_av.columns]
+            st.dataframe(df_av[cols_ordenadas])
+
+            # mesmo formato que o download individual (to_csv); são poucas linhas por sessão
+            csv_bytes = df_av[cols_ordenadas].to_csv(index=False).encode("utf-8")
+            st.download_button("Descarregar todas as avaliações (CSV)", data=csv_bytes, file_name="avaliacoes_sessao.csv", mime="text/csv")
+
+    # Footer / dicas
+    st.sidebar.markdown("---")
+    st.sidebar.write("Dicas:")
+    st.sidebar.write("- Coloca este ficheiro (app_Version4.py) e requirements.txt na raiz do repo antes de fazer deploy.")
+    st.sidebar.write("- Se usares Excel (.xlsx / .xlsm), garante python-calamine (ou openpyxl) no requirements.")
+
+
+# O Streamlit volta a correr o script inteiro a cada interação e cria muitos objetos de vida curta
+# (pandas/plotly); desligar o GC automático durante main() evita varrimentos a meio do rerun.
+# O GC é estado global do processo (partilhado por todas as sessões), por isso é reativado num finally:
+# o Streamlit interrompe o script com RerunException/StopException e qualquer erro também o interromperia.
+# A cada GC_COLLECT_EVERY reruns da sessão faz-se uma recolha completa, depois de a página estar desenhada.
+gc.disable()
+try:
+    main()
+finally:
+    gc.enable()
+    st.session_state["_reruns"] = st.session_state.get("_reruns", 0) + 1
+    if st.session_state["_reruns"] % GC_COLLECT_EVERY == 0:
+        gc.collect()